@@ -1,54 +1,169 @@
 import os
+import json
+import logging
+import hashlib
 import time
-from datetime import datetime, timedelta, timezone
+import calendar
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
 import feedparser
 
 
-def get_recent_stories():
+# 根 logger 保持 INFO，避免 urllib3 的 debug 日志输出包含完整 SendKey 的请求路径
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+logger = logging.getLogger(__name__)
+# 设置环境变量 DEBUG 后只对本模块输出调试信息，否则 debug 级别日志在格式化前就会被过滤掉
+logger.setLevel(logging.DEBUG if os.getenv("DEBUG") else logging.INFO)
+
+# 模块级共享 Session，复用 TCP/TLS 连接，避免每次请求重新握手
+# 并发抓取 RSS 的最大线程数，与连接池大小一致，同一主机的并发连接数不会超过连接池
+MAX_FEED_WORKERS = 4
+
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=MAX_FEED_WORKERS))
+
+# 请求超时时间 (秒)
+FEED_TIMEOUT = 15
+PUSH_TIMEOUT = 30
+
+
+# 要抓取的 RSS 源列表
+FEED_URLS = [
+    "https://news.ycombinator.com/rss",
+]
+
+# 保存每个 RSS 源的 ETag / Last-Modified、故事缓存和上次推送内容的哈希，用于下次运行时跳过重复请求
+STATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "state", "feed.json")
+
+
+def load_state():
     """
-    从 Hacker News RSS 获取过去 24 小时的故事标题。
-    你可以替换这个函数来抓取你想要的科技资讯源。
+    读取上次运行保存的状态，文件不存在或损坏时返回空字典
     """
-    print("Fetching stories from Hacker News...")
-    rss_url = "https://news.ycombinator.com/rss"
     try:
-        feed = feedparser.parse(rss_url)
-    except Exception as e:
-        print(f"Error fetching or parsing RSS feed: {e}")
-        return []
+        with open(STATE_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state):
+    """
+    保存状态到 STATE_FILE，供下次运行使用
+    """
+    try:
+        os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+        with open(STATE_FILE, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        logger.warning("Failed to save state file: %s", e)
+
+
+def fetch_feed(rss_url, feed_state, cutoff):
+    """
+    抓取单个 RSS 源中发布时间不早于 cutoff 的故事，返回 (标题, 链接, 发布时间戳) 列表。
+    源站自上次运行以来没有更新时返回 None；抓取成功时新的 ETag / Last-Modified 和故事列表会写入 feed_state。
+    """
+    logger.info("Fetching stories from %s...", rss_url)
+
+    # 先发一个只有响应头的 HEAD 请求，ETag / Last-Modified 与上次一致则无需下载和解析
+    if feed_state.get("etag") or feed_state.get("modified"):
+        try:
+            head = SESSION.head(rss_url, timeout=FEED_TIMEOUT)
+            if (head.ok
+                    and head.headers.get("ETag") == feed_state.get("etag")
+                    and head.headers.get("Last-Modified") == feed_state.get("modified")):
+                logger.info("Feed %s unchanged since last run (HEAD).", rss_url)
+                return None
+        except requests.exceptions.RequestException as e:
+            # HEAD 失败不影响后续的完整请求
+            logger.warning("HEAD request to %s failed, falling back to GET: %s", rss_url, e)
 
-    if not feed.entries:
-        print("No entries found in the feed.")
+    # 带上上次的 ETag / Last-Modified，源站未更新时会直接返回 304
+    headers = {}
+    if feed_state.get("etag"):
+        headers["If-None-Match"] = feed_state["etag"]
+    if feed_state.get("modified"):
+        headers["If-Modified-Since"] = feed_state["modified"]
+    try:
+        # 用 requests 下载，和推送共用同一套 HTTP 客户端与超时设置
+        response = SESSION.get(rss_url, headers=headers, timeout=FEED_TIMEOUT)
+        if response.status_code == 304:
+            logger.info("Feed %s not modified since last run (304).", rss_url)
+            return None
+        response.raise_for_status()
+        feed = feedparser.parse(response.content)
+        # 只保留用到的字段，尽早释放 feedparser 的完整解析结果
+        entries = [(entry.get('title'), entry.get('link'), entry.get('published_parsed')) for entry in feed.entries]
+        del feed
+    except Exception as e:
+        logger.error("Error fetching or parsing RSS feed %s: %s", rss_url, e)
         return []
 
-    # 获取 24 小时前的时间戳 (UTC)
-    utc_now = datetime.now(timezone.utc)
-    twenty_four_hours_ago = utc_now - timedelta(hours=24)
+    if not entries:
+        logger.info("No entries found in the feed %s.", rss_url)
 
-    recent_titles = []
-    for entry in feed.entries:
+    stories = []
+    for title, link, published_parsed in entries:
         # 尝试解析 entry 的发布时间
-        published_parsed = entry.get('published_parsed')
         if published_parsed:
-            entry_time = datetime(*published_parsed[:6], tzinfo=timezone.utc)
+            # published_parsed 是 UTC 的 struct_time，timegm 直接转为 epoch 秒
+            entry_ts = calendar.timegm(published_parsed)
         else:
              # 如果没有明确的发布时间，可以选择跳过或视为最新
              # 这里为了安全起见，假设没有时间的就是旧的，跳过
              continue
 
         # 检查是否在过去 24 小时内
-        if entry_time >= twenty_four_hours_ago:
-            title = entry.title
-            link = entry.link
-            # 限制标题长度，避免消息过长
-            truncated_title = f"{title[:100]}..." if len(title) > 100 else title
-            recent_titles.append(f"- [{truncated_title}]({link})")
-        elif entry_time < twenty_four_hours_ago:
+        if entry_ts >= cutoff:
+            # 缺少标题或链接的条目无法生成消息，单独跳过，不影响同一源的其他条目
+            if not title or not link:
+                continue
+            # 限制标题长度，避免消息过长；只收集 (标题, 链接)，Markdown 在 main 中统一拼接
+            stories.append((title[:100] + "..." if len(title) > 100 else title, link, entry_ts))
+        else:
             # 因为 RSS 通常是按时间倒序排列的，一旦遇到超过 24 小时的就可以停止了
             break
 
-    print(f"Found {len(recent_titles)} recent stories.")
+    # 只更新内存中的 state，推送成功后由 main 统一保存，避免推送失败后下次被 304 跳过
+    feed_state["etag"] = response.headers.get("ETag")
+    feed_state["modified"] = response.headers.get("Last-Modified")
+    feed_state["stories"] = stories
+    return stories
+
+
+def get_recent_stories(state):
+    """
+    并发抓取 FEED_URLS 中所有 RSS 源过去 24 小时的故事，返回 (标题, 链接) 列表。
+    所有源自上次运行以来都没有更新时返回 None。
+    你可以修改 FEED_URLS 来抓取你想要的科技资讯源。
+    """
+    if not FEED_URLS:
+        logger.warning("FEED_URLS is empty, no feeds to fetch.")
+        return []
+
+    # 获取 24 小时前的时间戳 (UTC epoch 秒)
+    cutoff = time.time() - 24 * 3600
+    feeds_state = state.setdefault("feeds", {})
+    # 每个源的状态字典只由一个线程写入，在提交任务前创建好
+    feed_states = [feeds_state.setdefault(url, {}) for url in FEED_URLS]
+
+    # 网络等待为主，多个源并发抓取，总耗时约为最慢的一个源
+    with ThreadPoolExecutor(max_workers=min(len(FEED_URLS), MAX_FEED_WORKERS)) as executor:
+        results = list(executor.map(fetch_feed, FEED_URLS, feed_states, [cutoff] * len(FEED_URLS)))
+
+    if all(stories is None for stories in results):
+        return None
+
+    recent_titles = []
+    for stories, feed_state in zip(results, feed_states):
+        if stories is None:
+            # 未更新的源沿用上次缓存的故事，按当前时间重新过滤
+            stories = feed_state.get("stories", [])
+        recent_titles.extend((title, link) for title, link, entry_ts in stories if entry_ts >= cutoff)
+
+    logger.info("Found %d recent stories.", len(recent_titles))
     return recent_titles
 
 
@@ -56,25 +171,21 @@ def send_to_wechat(message):
     """
     通过 Server酱 (ServerChan) 推送消息到微信
     """
-    # 打印 SendKey 的前几位用于调试，不泄露完整密钥
     sendkey = os.getenv("SERVER_CHAN_SENDKEY")
     if not sendkey:
-        print("ERROR: SERVER_CHAN_SENDKEY environment variable not found!")
-        print("Please check your GitHub Secrets configuration.")
+        logger.error("SERVER_CHAN_SENDKEY environment variable not found!")
+        logger.error("Please check your GitHub Secrets configuration.")
         return False
 
-    # --- Debugging Info Start ---
-    print("--- DEBUGGING INFO START ---")
-    print(f"Retrieved SendKey (first 5 chars): {sendkey[:5]}...")
-    print("--- DEBUGGING INFO END ---")
-    # --- Debugging Info End ---
+    # 只输出 SendKey 的前几位用于调试，不泄露完整密钥
+    logger.debug("Retrieved SendKey (first 5 chars): %s...", sendkey[:5])
 
     if not message.strip():
          message = "今日暂无更新的科技资讯。"
 
     # 准备发送的数据
     url = f"https://sctapi.ftqq.com/{sendkey}.send"
-    title = f"【每日科技资讯】{datetime.now().strftime('%Y-%m-%d')}"
+    title = f"【每日科技资讯】{time.strftime('%Y-%m-%d')}"
     
     # Server酱 v3 推荐使用 title 和 desp
     data = {
@@ -82,67 +193,73 @@ def send_to_wechat(message):
         "desp": message # 支持 Markdown 格式
     }
 
-    # --- Debugging Info Start ---
-    print("--- DEBUGGING INFO START ---")
-    print(f"Sending POST request to: {url}")
-    print(f"Payload (title only): {title}")
-    print(f"Payload (desp length): {len(message)} characters")
-    print("--- DEBUGGING INFO END ---")
-    # --- Debugging Info End ---
+    # URL 中包含完整 SendKey，日志里只输出前几位
+    logger.debug("Sending POST request to: https://sctapi.ftqq.com/%s....send", sendkey[:5])
+    logger.debug("Payload (title only): %s", title)
+    logger.debug("Payload (desp length): %d characters", len(message))
 
     try:
-        response = requests.post(url, data=data, timeout=30) # 增加超时时间
+        response = SESSION.post(url, data=data, timeout=PUSH_TIMEOUT)
         response.raise_for_status() # 检查 HTTP 错误
-        result_text = response.text
-        result_json = response.json()
-        
-        # --- Debugging Info Start ---
-        print("--- DEBUGGING INFO START ---")
-        print(f"ServerChan Response Status Code: {response.status_code}")
-        print(f"ServerChan Raw Response Text: {result_text}")
-        print(f"ServerChan Parsed JSON: {result_json}")
-        print("--- DEBUGGING INFO END ---")
-        # --- Debugging Info End ---
+        try:
+            result_json = response.json()
+        except ValueError: # JSON decode error，只有解析失败时才需要原始文本
+            logger.error("ServerChan response is not valid JSON: %s", response.text)
+            return False
+
+        logger.debug("ServerChan Response Status Code: %s", response.status_code)
+        logger.debug("ServerChan Parsed JSON: %s", result_json)
 
         if result_json.get("code") == 0: # Server酱成功返回码
-            print("SUCCESS: Message sent successfully via ServerChan!")
+            logger.info("Message sent successfully via ServerChan!")
             return True
         else:
-            print(f"WARNING: ServerChan returned non-zero code: {result_json.get('code')}")
-            print(f"ServerChan Error Message: {result_json.get('message', 'Unknown error')}")
+            logger.warning("ServerChan returned non-zero code: %s", result_json.get("code"))
+            logger.warning("ServerChan Error Message: %s", result_json.get("message", "Unknown error"))
             return False
     except requests.exceptions.Timeout:
-        print(f"ERROR: Request to ServerChan timed out.")
+        logger.error("Request to ServerChan timed out.")
         return False
     except requests.exceptions.RequestException as e:
-        print(f"ERROR: Network or HTTP error occurred when sending to ServerChan: {e}")
+        logger.error("Network or HTTP error occurred when sending to ServerChan: %s", e)
         return False
-    except ValueError: # JSON decode error
-         print(f"ERROR: ServerChan response is not valid JSON: {response.text if 'response' in locals() else 'Response object not available'}")
-         return False
 
 
 def main():
-    print("Starting daily tech news fetch process...")
+    logger.info("Starting daily tech news fetch process...")
+
+    state = load_state()
 
     # 1. 抓取资讯
-    recent_stories = get_recent_stories()
+    recent_stories = get_recent_stories(state)
+    if recent_stories is None:
+        logger.info("No new data upstream, skipping push.")
+        return
 
     # 2. 构造要发送的消息
     if recent_stories:
-        message = "\n".join(recent_stories)
+        message = "\n".join(f"- [{title}]({link})" for title, link in recent_stories)
         # 可选：添加一些说明文字
         # message = f"过去24小时热门科技资讯:\n\n{message}"
     else:
         message = "" # 如果没有抓取到，则发送默认消息
 
+    # 内容与上次推送的相同则不再重复推送
+    titles_hash = hashlib.blake2b(message.encode("utf-8")).hexdigest()
+    if titles_hash == state.get("titles_hash"):
+        logger.info("Stories unchanged since last push, skipping push.")
+        save_state(state)
+        return
+
     # 3. 推送消息
     success = send_to_wechat(message)
 
     if success:
-        print("Process completed successfully.")
+        state["titles_hash"] = titles_hash
+        save_state(state)
+        logger.info("Process completed successfully.")
     else:
-        print("Process failed.")
+        logger.error("Process failed.")
         # exit(1) # 可选：失败时退出非零状态，这在 CI/CD 中常用，此处非必需
 
 